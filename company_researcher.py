@@ -3,9 +3,11 @@ Leverage AI to find info about prospective company / role.
 """
 
 import datetime
+import functools
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from langchain_anthropic import ChatAnthropic
@@ -21,11 +23,25 @@ DATA_DIR = os.path.join(HERE, "data")
 
 logger = logging.getLogger(__name__)
 
+LLM_CACHE_PATH = os.path.join(DATA_DIR, "langchain-cache.db")
+
+
+@functools.lru_cache(maxsize=1)
+def _enable_llm_cache():
+    """Cache LLM responses on disk to reduce LLM calls. Only needs doing once."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    set_llm_cache(SQLiteCache(database_path=LLM_CACHE_PATH))
+
 
 # Tavily API has undocumented input limit of 400 for get_search_context(query)
 # HACK: We have to be very careful to keep prompts under this limit.
 GET_SEARCH_CONTEXT_INPUT_LIMIT = 400
 
+# We want facts, not creativity; this also makes the LLM cache hit more reliably.
+TEMPERATURE = 0
+# Answers are small JSON objects; this only stops runaway generations.
+MAX_TOKENS = 1024
+
 # PROMPT_LIMIT
 BASIC_COMPANY_PROMPT = """
 For the company at {company_info.company_identifier}, find:
@@ -153,9 +169,8 @@ class TavilyRAGResearchAgent:
     def __init__(self, verbose: bool = False, llm: Optional[object] = None):
 
         # set up the agent
-        self.llm = llm or ChatOpenAI(model_name="gpt-4", temperature=0.7)
-        # Cache to reduce LLM calls.
-        set_llm_cache(SQLiteCache(database_path=".langchain-cache.db"))
+        self.llm = llm or _get_llm("gpt-4", TEMPERATURE)
+        _enable_llm_cache()
         self.verbose = verbose
         self.tavily_client = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
 
@@ -208,9 +223,9 @@ class TavilyRAGResearchAgent:
                 f"Truncating prompt from {len(prompt)} to {GET_SEARCH_CONTEXT_INPUT_LIMIT} characters"
             )
             prompt = prompt[:GET_SEARCH_CONTEXT_INPUT_LIMIT]
-            logger.debug(f"Prompt truncated: {prompt}")
+            logger.debug("Prompt truncated: %s", prompt)
         else:
-            logger.debug(f"Prompt not truncated: {prompt}")
+            logger.debug("Prompt not truncated: %s", prompt)
 
         context = self.tavily_client.get_search_context(
             query=prompt,
@@ -245,34 +260,55 @@ class TavilyRAGResearchAgent:
             company_info.recruit_contact = data.get("recruiter_name", "")
             print(f"Company info: {company_info}")
 
-        for prompt, format_prompt in COMPANY_PROMPTS_WITH_FORMAT_PROMPT:
-            try:
-                context = self.get_search_context(prompt)
-                logger.debug(f"  Got Context: {len(context)}")
-                full_prompt = self.make_prompt(
+        # The prompts don't depend on each other's answers, so run the
+        # search + LLM round trips concurrently.
+        with ThreadPoolExecutor(
+            max_workers=len(COMPANY_PROMPTS_WITH_FORMAT_PROMPT)
+        ) as pool:
+            # Each prompt gets its own snapshot, since we update company_info
+            # below while later prompts may not have been formatted yet.
+            futures = [
+                pool.submit(
+                    self.research_prompt,
                     prompt,
                     format_prompt,
-                    extra_context=context,
-                    company_info=company_info,
+                    company_info.model_copy(),
                 )
-                logger.debug(f"  Full prompt:\n\n {full_prompt}\n\n")
-                result = self.llm.invoke(full_prompt)
-                # TODO: Handle malformed JSON
-                try:
-                    content = json.loads(result.content)
-                    logger.debug(f"  Content returned from llm:\n\n {content}\n\n")
-                except Exception as e:
-                    logger.error(
-                        f"Error parsing JSON raw string:\n'{result.content}'\n"
-                    )
-                    raise
-
+                for prompt, format_prompt in COMPANY_PROMPTS_WITH_FORMAT_PROMPT
+            ]
+            # Apply results in prompt order, so later prompts win conflicts as before.
+            for future in futures:
+                content = future.result()
                 # Map the API response fields to CompaniesSheetRow fields
                 self.update_company_info_from_dict(company_info, content)
+        return company_info
+
+    def research_prompt(
+        self, prompt: str, format_prompt: str, company_info: CompaniesSheetRow
+    ) -> dict:
+        """Search for context for one prompt and return the LLM's parsed JSON answer."""
+        try:
+            context = self.get_search_context(prompt)
+            logger.debug(f"  Got Context: {len(context)}")
+            full_prompt = self.make_prompt(
+                prompt,
+                format_prompt,
+                extra_context=context,
+                company_info=company_info,
+            )
+            logger.debug("  Full prompt:\n\n %s\n\n", full_prompt)
+            result = self.llm.invoke(full_prompt)
+            # TODO: Handle malformed JSON
+            try:
+                content = json.loads(result.content)
+                logger.debug("  Content returned from llm:\n\n %s\n\n", content)
             except Exception as e:
-                logger.error(f"Error processing prompt: {e}")
+                logger.error(f"Error parsing JSON raw string:\n'{result.content}'\n")
                 raise
-        return company_info
+            return content
+        except Exception as e:
+            logger.error(f"Error processing prompt: {e}")
+            raise
 
     def update_company_info_from_dict(
         self, company_info: CompaniesSheetRow, content: dict
@@ -314,10 +350,24 @@ class TavilyRAGResearchAgent:
 
         update_field_from_key_if_present("ai_notes", "ai_notes")
 
-        logger.debug(f"  DATA SO FAR:\n{company_info}\n\n")
+        logger.debug("  DATA SO FAR:\n%s\n\n", company_info)
         return company_info
 
 
+@functools.lru_cache(maxsize=4)
+def _get_llm(model: str, temperature: float):
+    """Return a shared chat model client, so its connection pool is reused."""
+    if model.startswith("gpt-"):
+        return ChatOpenAI(
+            model_name=model, temperature=temperature, max_tokens=MAX_TOKENS
+        )
+    elif model.startswith("claude"):
+        return ChatAnthropic(
+            model_name=model, temperature=temperature, max_tokens=MAX_TOKENS
+        )
+    raise ValueError(f"Unknown model: {model}")
+
+
 def main(
     url_or_message: str,
     model: str,
@@ -335,13 +385,7 @@ def main(
         verbose: Whether to enable verbose logging
         is_url: Force interpretation as URL (True) or message (False). If None, will try to auto-detect.
     """
-    TEMPERATURE = 0.7  # TBD what's a good range for this use case? Is this high?
-    if model.startswith("gpt-"):
-        llm = ChatOpenAI(model_name=model, temperature=TEMPERATURE)
-    elif model.startswith("claude"):
-        llm = ChatAnthropic(model_name=model, temperature=TEMPERATURE)
-    else:
-        raise ValueError(f"Unknown model: {model}")
+    llm = _get_llm(model, TEMPERATURE)
 
     researcher = TavilyRAGResearchAgent(verbose=verbose, llm=llm)
 
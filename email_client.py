@@ -19,6 +19,26 @@ TOKEN_FILE = os.path.join(AUTH_DIR, "token.json")
 RECRUITER_REPLIES_QUERY = "label:jobs-2024/recruiter-pings-archived from:me"
 RECRUITER_MESSAGES_QUERY = "label:jobs-2024/recruiter-pings"
 
+# Compiled once; these run on every line of every message.
+ANGLE_BRACKETED_RE = re.compile(r"<\S+>")
+IMAGE_PLACEHOLDER_RE = re.compile(r"\[image:.*?\]")
+# Matches eg "On Mon, Jan 1, 2024 at 10:00 AM Someone <foo@bar.com> wrote:"
+QUOTE_HEADER_RE = re.compile(
+    r"\nOn .+?(?:\d{1,2}:\d{2}(?: [AP]M)?|\d{4}).*?(?:\S+@\S+|<\S+@\S+>)\s+wrote:",
+    flags=re.DOTALL | re.IGNORECASE,
+)
+
+LINKEDIN_GARBAGE_LINE_PREFIXES = (
+    "This email was intended for",
+    "Get the new LinkedIn",
+    "Also available on mobile",
+    "*Tip:* You can respond to ",
+    "See all connections in common",
+    "View profile:",
+    "Accept:http",
+    "-------------------------------",
+)
+
 
 logger = logging.getLogger(__name__)
 class GmailRepliesSearcher:
@@ -103,28 +123,15 @@ class GmailRepliesSearcher:
         return text
 
     def _is_garbage_line(self, line):
-        linkedin_garbage_lines = (
-            "This email was intended for",
-            "Get the new LinkedIn",
-            "Also available on mobile",
-            "*Tip:* You can respond to ",
-            "See all connections in common",
-            "View profile:",
-            "Accept:http",
-            "-------------------------------",
-        )
-        for garbage in linkedin_garbage_lines:
-            if line.startswith(garbage):
-                return True
-        return False
+        return line.startswith(LINKEDIN_GARBAGE_LINE_PREFIXES)
 
     def clean_quoted_text(self, text):
         lines = text.splitlines()
         cleaned_lines = []
         for line in lines:
             line = line.lstrip("> ")
-            line = re.sub(r"<\S+>", "", line)
-            line = re.sub(r"\[image:.*?\]", "", line, flags=re.MULTILINE)
+            line = ANGLE_BRACKETED_RE.sub("", line)
+            line = IMAGE_PLACEHOLDER_RE.sub("", line)
             line = line.strip()
             if self._is_garbage_line(line):
                 break
@@ -133,8 +140,7 @@ class GmailRepliesSearcher:
         return "\n".join(cleaned_lines)
 
     def split_message(self, content):
-        pattern = r"\nOn .+?(?:\d{1,2}:\d{2}(?: [AP]M)?|\d{4}).*?(?:\S+@\S+|<\S+@\S+>)\s+wrote:"
-        match = re.split(pattern, content, flags=re.DOTALL | re.IGNORECASE)
+        match = QUOTE_HEADER_RE.split(content)
         if len(match) > 1:
             reply_text = self.clean_reply(match[0])
             quoted_text = self.clean_quoted_text(match[-1])
@@ -62,6 +62,9 @@ class CacheSettings:
 # TODO: Redesign this to not be global
 cache_args = CacheSettings()
 
+# Matches eg " at 0x7f..." in default object reprs, which vary between runs.
+MEMORY_ADDRESS_RE = re.compile(r" at 0x[0-9a-fA-F]+")
+
 def disk_cache(step: CacheStep):
 
     def decorator(func):
@@ -71,8 +74,8 @@ def disk_cache(step: CacheStep):
             clear_cache = cache_args.should_clear_cache(step)
 
             # Remove memory addresses from string representations
-            args_str = re.sub(r" at 0x[0-9a-fA-F]+", "", str(args))
-            kwargs_str = re.sub(r" at 0x[0-9a-fA-F]+", "", str(kwargs))
+            args_str = MEMORY_ADDRESS_RE.sub("", str(args))
+            kwargs_str = MEMORY_ADDRESS_RE.sub("", str(kwargs))
             key = f"{func.__name__}:{args_str}:{kwargs_str}"
             result = None
 
@@ -82,14 +85,14 @@ def disk_cache(step: CacheStep):
             if use_cache:
                 result = cache.get(key)
                 if result is None:
-                    logger.debug(f"Cache miss for {key}")
+                    logger.debug("Cache miss for %s", key)
                 else:
-                    logger.debug(f"Cache hit for {key}")
+                    logger.debug("Cache hit for %s", key)
 
             if result is None:
-                logger.debug(f"No cached result, running function for {key}...")
+                logger.debug("No cached result, running function for %s...", key)
                 result = func(*args, **kwargs)
-                logger.debug(f"... Ran function for {key}")
+                logger.debug("... Ran function for %s", key)
             if use_cache:
                 cache.set(key, result)
 
@@ -393,7 +396,7 @@ def main(args, loglevel: int = logging.INFO):
         )
         # TODO: pass subject too?
         company_info = initial_research_company(content, model=args.model)
-        logger.debug(f"Company info after initial research: {company_info}\n\n")
+        logger.debug("Company info after initial research: %s\n\n", company_info)
         generated_reply = email_responder.generate_reply(content)
         logger.info(f"------ GENERATED REPLY:\n{generated_reply[:400]}\n\n")
         if is_good_fit(company_info):
@@ -1,7 +1,12 @@
+import functools
+import hashlib
+import itertools
 import os
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
 import logging
 
+import chromadb
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
@@ -10,10 +15,13 @@ from langchain_anthropic import ChatAnthropic
 from langchain_chroma import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 
 logger = logging.getLogger(__name__)
 
-TEMPLATE = """You are an AI assistant helping to generate replies to recruiter messages
+# Static instructions go first, in their own message, so providers can cache
+# them as a prompt prefix; only the human message varies between calls.
+SYSTEM_TEMPLATE = """You are an AI assistant helping to generate replies to recruiter messages
 based on previous interactions.
 Use the following pieces of context to generate a reply to the recruiter message.
 The reply should be professional, courteous, and in a similar style and length 
@@ -37,9 +45,9 @@ Also observe these additional constraints on generated content:
 - If declining because of other criteria, be specific about the criteria that are not met.
 - If mentioning my previous roles by title, only mention the staff developer role.
 - If they require full stack or javascript, mention that those aren't my strengths.
-- Desired locations are NYC (New York City), or remote. No relocations.
+- Desired locations are NYC (New York City), or remote. No relocations."""
 
-Context: {context}
+HUMAN_TEMPLATE = """Context: {context}
 
 Recruiter Message: {question}
 
@@ -49,6 +57,142 @@ Generated Reply:"""
 HERE = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(HERE, "data")
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+# OpenAI embeddings are unit length, so cosine ranks the same as inner product
+# and needs no normalization on our side.
+COLLECTION_METADATA = {"hnsw:space": "cosine"}
+# Vectors from different models can't share a collection, and Chroma can't
+# change a collection's distance function after it's created.
+COLLECTION_NAME = f"recruiter-replies-{EMBEDDING_MODEL}-cosine"
+
+# Max texts per embeddings request; also how many chunks we add to Chroma at once.
+EMBEDDING_BATCH_SIZE = 1000
+EMBEDDING_CONCURRENCY = 4
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# Shorter suffix/prefix matches between chunks are likely coincidence, not overlap.
+MIN_TRIMMED_OVERLAP = 20
+
+
+@functools.lru_cache(maxsize=4)
+def _get_llm(llm_type: str, temperature: float):
+    """Return a shared chat model client for this llm_type and temperature."""
+    if llm_type.lower() == "openai":
+        return ChatOpenAI(temperature=temperature)
+    elif llm_type.lower() == "claude":
+        return ChatAnthropic(
+            model="claude-3-5-sonnet-20240620", temperature=temperature
+        )
+    elif llm_type.startswith("gpt"):
+        return ChatOpenAI(model=llm_type, temperature=temperature)
+    elif llm_type.startswith("claude"):
+        return ChatAnthropic(model=llm_type, temperature=temperature)
+    raise ValueError(f"Invalid llm_type. Choose 'openai' or 'claude' or 'gpt'.")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_embeddings() -> OpenAIEmbeddings:
+    """Return a shared embeddings client, reusing its HTTP client and tokenizer."""
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL, chunk_size=EMBEDDING_BATCH_SIZE)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_chroma_client(path: str):
+    """Open the persistent Chroma store once per process."""
+    return chromadb.PersistentClient(path=path)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_prompt() -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages(
+        [("system", SYSTEM_TEMPLATE), ("human", HUMAN_TEMPLATE)]
+    )
+
+
+def _overlap_length(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is also a prefix of `second`."""
+    for size in range(min(len(first), len(second), CHUNK_OVERLAP), 0, -1):
+        if size < MIN_TRIMMED_OVERLAP:
+            break
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+def format_context(docs: list[Document]) -> str:
+    """
+    Join retrieved chunks into one context string for the prompt,
+    dropping text that neighboring chunks share due to splitter overlap.
+    """
+    texts: list[str] = []
+    for doc in docs:
+        text = doc.page_content
+        if any(text in prev for prev in texts):
+            continue
+        for prev in texts:
+            text = text[_overlap_length(prev, text) :]
+            trailing = _overlap_length(text, prev)
+            if trailing:
+                text = text[:-trailing]
+        if text.strip():
+            texts.append(text)
+    return "\n---\n".join(texts)
+
+
+def _batch_by_source(
+    docs: list[Document], ids: list[str]
+) -> list[tuple[list[Document], list[str]]]:
+    """
+    Group chunks into batches of up to EMBEDDING_BATCH_SIZE, never splitting
+    one source message across batches. If a batch fails to add, none of its
+    messages' source_hash is stored, so they're retried on the next run.
+    A message with more chunks than the batch size gets a batch of its own.
+    """
+    batches = []
+    batch_docs: list[Document] = []
+    batch_ids: list[str] = []
+    # The splitter emits each message's chunks contiguously.
+    for _, group in itertools.groupby(
+        zip(docs, ids), key=lambda pair: pair[0].metadata["source_hash"]
+    ):
+        group = list(group)
+        if batch_docs and len(batch_docs) + len(group) > EMBEDDING_BATCH_SIZE:
+            batches.append((batch_docs, batch_ids))
+            batch_docs, batch_ids = [], []
+        batch_docs.extend(doc for doc, _ in group)
+        batch_ids.extend(doc_id for _, doc_id in group)
+    if batch_docs:
+        batches.append((batch_docs, batch_ids))
+    return batches
+
+
+class QueryCachingEmbeddings(Embeddings):
+    """Wraps an Embeddings, caching embed_query() results by text."""
+
+    def __init__(self, embeddings: Embeddings, maxsize: int):
+        self.embeddings = embeddings
+        self._embed_query = functools.lru_cache(maxsize=maxsize)(
+            self._embed_query_uncached
+        )
+
+    def _embed_query_uncached(self, text: str) -> tuple[float, ...]:
+        return tuple(self.embeddings.embed_query(text))
+
+    def embed_query(self, text: str) -> list[float]:
+        return list(self._embed_query(text))
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
 
 class RecruitmentRAG:
 
@@ -56,45 +200,91 @@ class RecruitmentRAG:
         if len(messages) == 0:
             raise ValueError("No messages provided")
         self.messages = messages
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200
+        self.text_splitter = _get_text_splitter()
+        # Regenerating a reply for the same message shouldn't re-embed it.
+        self.embeddings = QueryCachingEmbeddings(
+            _get_embeddings(), maxsize=QUERY_EMBEDDING_CACHE_SIZE
         )
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
         self.vectorstore = None
         self.retriever = None
         self.chain = None
         logger.setLevel(loglevel)
 
     def make_replies_vector_db(self, clear_existing: bool = False):
-        collection_name = "recruiter-replies"
+        collection_name = COLLECTION_NAME
         vectorstore = Chroma(
+            client=_get_chroma_client(DATA_DIR),
             collection_name=collection_name,
             embedding_function=self.embeddings,
-            persist_directory=DATA_DIR,
+            collection_metadata=COLLECTION_METADATA,
         )
-        # Only add the documents to the vectorstore if it's empty
-        has_data = bool(vectorstore.get(limit=1, include=[])["ids"])
-        if has_data and not clear_existing:
-            logger.info(f"Loaded vector store for {collection_name}")
-            return vectorstore
-
         if clear_existing:
             vectorstore.reset_collection()
 
         documents = []
         for subject, recruiter_message, my_reply in self.messages:
             text = f"Subject: {subject}\nRecruiter: {recruiter_message}\nMy Reply: {my_reply}"
-            documents.append(Document(page_content=text))
+            source_hash = hashlib.sha256(text.encode()).hexdigest()
+            documents.append(
+                Document(page_content=text, metadata={"source_hash": source_hash})
+            )
 
-        logger.info("Adding initial documents to the vector store from split data")
+        # Messages stored on a previous run don't need to be split again.
+        # The splitter copies source_hash onto every chunk's metadata.
+        source_hashes = [doc.metadata["source_hash"] for doc in documents]
+        stored = vectorstore.get(
+            where={"source_hash": {"$in": source_hashes}}, include=["metadatas"]
+        )
+        stored_hashes = {metadata["source_hash"] for metadata in stored["metadatas"]}
+        documents = [
+            doc for doc in documents if doc.metadata["source_hash"] not in stored_hashes
+        ]
+        if not documents:
+            logger.info(f"Loaded vector store for {collection_name}")
+            return vectorstore
 
         split_docs = self.text_splitter.split_documents(documents)
-        vectorstore.add_documents(split_docs)
+
+        # Ids are content hashes, so chunks that are already stored
+        # are never embedded again.
+        ids = [
+            hashlib.sha256(doc.page_content.encode()).hexdigest()
+            for doc in split_docs
+        ]
+        seen_ids = set(vectorstore.get(ids=ids, include=[])["ids"])
+        new_docs = []
+        new_ids = []
+        for doc, doc_id in zip(split_docs, ids):
+            if doc_id not in seen_ids:
+                seen_ids.add(doc_id)
+                new_docs.append(doc)
+                new_ids.append(doc_id)
+
+        if not new_docs:
+            logger.info(f"Loaded vector store for {collection_name}")
+            return vectorstore
+
+        logger.info(f"Adding {len(new_docs)} new documents to the vector store")
+        batches = _batch_by_source(new_docs, new_ids)
+        # Each batch is one embeddings request; overlap them, but bounded
+        # to stay clear of OpenAI rate limits.
+        with ThreadPoolExecutor(max_workers=EMBEDDING_CONCURRENCY) as pool:
+            list(
+                pool.map(
+                    lambda batch: vectorstore.add_documents(batch[0], ids=batch[1]),
+                    batches,
+                )
+            )
         return vectorstore
 
     def prepare_data(self, clear_existing: bool = False):
         self.vectorstore = self.make_replies_vector_db(clear_existing=clear_existing)
-        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
+        # MMR skips near-duplicate replies (eg to the same recruiter),
+        # so the few chunks we send cover more distinct examples.
+        self.retriever = self.vectorstore.as_retriever(
+            search_type="mmr",
+            search_kwargs={"k": 3, "fetch_k": 8, "lambda_mult": 0.5},
+        )
 
     def setup_chain(self, llm_type: str):
         if self.retriever is None:
@@ -102,23 +292,14 @@ class RecruitmentRAG:
 
         TEMPERATURE = 0.2  # Lowish because we're writing email to real people.
 
-        if llm_type.lower() == "openai":
-            llm = ChatOpenAI(temperature=TEMPERATURE)
-        elif llm_type.lower() == "claude":
-            llm = ChatAnthropic(
-                model="claude-3-5-sonnet-20240620", temperature=TEMPERATURE
-            )
-        elif llm_type.startswith("gpt"):
-            llm = ChatOpenAI(model=llm_type, temperature=TEMPERATURE)
-        elif llm_type.startswith("claude"):
-            llm = ChatAnthropic(model=llm_type, temperature=TEMPERATURE)
-        else:
-            raise ValueError(f"Invalid llm_type. Choose 'openai' or 'claude' or 'gpt'.")
-
-        prompt = ChatPromptTemplate.from_template(TEMPLATE)
+        llm = _get_llm(llm_type, TEMPERATURE)
+        prompt = _get_prompt()
 
         self.chain = (
-            {"context": self.retriever, "question": RunnablePassthrough()}
+            {
+                "context": self.retriever | format_context,
+                "question": RunnablePassthrough(),
+            }
             | prompt
             | llm
             | StrOutputParser()
@@ -128,3 +309,13 @@ class RecruitmentRAG:
         if self.chain is None:
             raise ValueError("Chain not set up. Call setup_chain() first.")
         return self.chain.invoke(new_recruiter_message)
+
+    def stream_reply(self, new_recruiter_message: str) -> Iterator[str]:
+        """
+        Like generate_reply(), but yields text as the LLM produces it,
+        so callers can show the reply before it's finished.
+        Note streamed calls don't go through the LangChain LLM cache.
+        """
+        if self.chain is None:
+            raise ValueError("Chain not set up. Call setup_chain() first.")
+        return self.chain.stream(new_recruiter_message)
@@ -13,7 +13,7 @@ import os
 import os.path
 import sys
 from decimal import Decimal
-from typing import Any, ClassVar, Generator, Iterator, Optional
+from typing import Any, Callable, ClassVar, Generator, Iterator, Optional
 
 import dateutil.parser
 from google.auth.exceptions import RefreshError
@@ -45,6 +45,56 @@ SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 FIRST_DATA_ROW = 2  # 0-indexed
 
 
+def _parse_date(val: str) -> datetime.date | None:
+    if not val.strip():
+        return None
+    try:
+        # Fast path: dates we wrote ourselves are ISO 8601.
+        return datetime.date.fromisoformat(val)
+    except ValueError:
+        try:
+            return dateutil.parser.parse(val)
+        except (ValueError, ValidationError):
+            # TODO: only do this if optional
+            return None
+
+
+def _parse_bool(val: str) -> bool | None:
+    # as_list_of_str() writes True as "True"; accept it so rows round-trip.
+    return val.strip().lower() in ("yes", "true") if val else None
+
+
+def _parse_int(val: str) -> int | None:
+    val = val.strip().replace(",", "")
+    val = val.split(".")[0]
+    return int(val) if val else None
+
+
+def _parse_decimal(val: str) -> Decimal | None:
+    if not val.strip():
+        return None
+    try:
+        return Decimal(val)
+    except decimal.InvalidOperation:
+        # TODO: only do this if optional
+        return None
+
+
+def _string_parser_for(annotation: Any) -> Callable[[str], Any] | None:
+    """Pick the parser for string cell values of a field with this annotation."""
+    # Hacky, is there a better way to handle eg Optional[date]?
+    annotation = str(annotation)
+    if "date" in annotation:
+        return _parse_date
+    elif "bool" in annotation:
+        return _parse_bool
+    elif "int" in annotation:
+        return _parse_int
+    elif "Decimal" in annotation:
+        return _parse_decimal
+    return None
+
+
 class BaseSheetRow(BaseModel):
     """Base class for spreadsheet rows."""
 
@@ -54,40 +104,39 @@ class BaseSheetRow(BaseModel):
     fill_columns: ClassVar[tuple[str, ...]] = tuple()
     sort_by_date_field: ClassVar[str] = ""
 
+    # Per-subclass field metadata, computed once in __pydantic_init_subclass__.
+    _field_defaults: ClassVar[dict[str, Any]] = {}
+    _field_names: ClassVar[tuple[str, ...]] = ()
+    _field_parsers: ClassVar[dict[str, Callable[[str], Any]]] = {}
+
     model_config = {
         "from_attributes": True,
         "str_strip_whitespace": True,
         "coerce_numbers_to_str": False,
     }
 
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        cls._field_defaults = {
+            name: field.default for name, field in cls.model_fields.items()
+        }
+        cls._field_names = tuple(cls.model_fields)
+        cls._field_parsers = {}
+        for name, field in cls.model_fields.items():
+            parse = _string_parser_for(field.annotation)
+            if parse is not None:
+                cls._field_parsers[name] = parse
+
     @model_validator(mode="before")
     @classmethod
     def normalize_base_fields(cls, data: Any) -> dict:
         """Pre-process fields before Pydantic validation"""
         if isinstance(data, dict):
-            for field_name, field in cls.model_fields.items():
-                # Hacky, is there a better way to handle eg Optional[date]?
+            for field_name, parse in cls._field_parsers.items():
                 val = data.get(field_name)
-                if "date" in str(field.annotation) and isinstance(val, str):
-                    try:
-                        data[field_name] = dateutil.parser.parse(data[field_name])
-                    except (ValueError, ValidationError):
-                        # TODO: only do this if optional
-                        data[field_name] = None
-                elif "bool" in str(field.annotation) and isinstance(val, str):
-                    data[field_name] = (
-                        val.strip().strip().lower() == "yes" if val else None
-                    )
-                elif "int" in str(field.annotation) and isinstance(val, str):
-                    val = val.strip().replace(",", "")
-                    val = val.split(".")[0]
-                    data[field_name] = int(val) if val else None
-                elif "Decimal" in str(field.annotation) and isinstance(val, str):
-                    try:
-                        data[field_name] = Decimal(val)
-                    except decimal.InvalidOperation:
-                        # TODO: only do this if optional
-                        data[field_name] = None
+                if isinstance(val, str):
+                    data[field_name] = parse(val)
         return data
 
     @classmethod
@@ -106,7 +155,7 @@ class BaseSheetRow(BaseModel):
     def field_index(cls, field_name: str) -> int:
         """Get the index of a field in the row"""
         try:
-            return list(cls.model_fields.keys()).index(field_name)
+            return cls._field_names.index(field_name)
         except ValueError:
             raise ValueError(f"Field {field_name} not found")
 
@@ -114,19 +163,22 @@ class BaseSheetRow(BaseModel):
     def field_name(cls, index: int) -> str:
         """Get the name of a field by its index"""
         try:
-            return list(cls.model_fields.keys())[index]
+            return cls._field_names[index]
         except IndexError:
             raise IndexError(f"Field index {index} out of range")
 
     def iter_to_strs(self) -> Iterator[str]:
         """Iterate through fields as strings"""
-        for field_name in self.model_fields.keys():
-            value = getattr(self, field_name)
+        # Pydantic keeps __dict__ in field declaration order.
+        for value in self.__dict__.values():
             yield str(value) if value is not None else ""
 
     def as_list_of_str(self) -> list[str]:
         """Convert row back to list of strings"""
-        return list(self.iter_to_strs())
+        return [
+            str(value) if value is not None else ""
+            for value in self.__dict__.values()
+        ]
 
     def __len__(self) -> int:
         """Return the number of fields in the row"""
@@ -135,12 +187,12 @@ class BaseSheetRow(BaseModel):
     def __str__(self) -> str:
         """Custom string representation showing only non-default values"""
         cls_name = self.__class__.__name__
-        fields = []
-        for name, field in self.model_fields.items():
-            value = getattr(self, name)
-            default = field.default
-            if value != default:
-                fields.append(f"{name}={value}")
+        defaults = self._field_defaults
+        fields = [
+            f"{name}={value}"
+            for name, value in self.__dict__.items()
+            if value != defaults.get(name)
+        ]
         if fields:
             return f"{cls_name}({', '.join(fields)})"
         return f"{cls_name}()"
@@ -157,8 +209,7 @@ class BaseSheetRow(BaseModel):
     @classmethod
     def from_list(cls, row_data: list[str]) -> "BaseSheetRow":
         """Convert a list of strings into a row instance"""
-        field_names = [name for name in cls.model_fields.keys()]
-        return cls(**dict(zip(field_names, row_data)))
+        return cls(**dict(zip(cls._field_names, row_data)))
 
     @property
     def company_identifier(self) -> str: